@@ -1,87 +1,163 @@
+import itertools
 import sqlite3
-import random
 from datetime import datetime, timedelta
 
-# Connect to SQLite database
-conn = sqlite3.connect('sales_database.db')
-cursor = conn.cursor()
-
-# Create a new table for user purchase behavior
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS user_purchase_behavior (
-    user_id INTEGER PRIMARY KEY,
-    customer_id INTEGER,
-    has_purchased_product BOOLEAN NOT NULL,
-    purchase_likelihood REAL NOT NULL,
-    has_purchased_service BOOLEAN NOT NULL,
-    service_purchase_likelihood REAL NOT NULL,
-    last_interaction_date TEXT,
-    FOREIGN KEY (customer_id) REFERENCES customers (customer_id)
-)
-''')
-
-# Get existing customer IDs
-cursor.execute("SELECT customer_id FROM customers")
-customer_ids = [row[0] for row in cursor.fetchall()]
-
-# Generate 15 rows of user purchase behavior data
-purchase_behavior_data = []
-for i in range(1, 16):
-    customer_id = random.choice(customer_ids)
-    has_purchased_product = random.choice([0, 1])  # 0 for False, 1 for True
-    
+import numpy as np
+
+# ~40 rows per INSERT is the sweet spot: one prepared statement amortizes
+# parse/plan cost without building oversized SQL strings
+BATCH_SIZE = 40
+
+NUM_ROWS = 15
+
+
+def connect(db_path='sales_database.db'):
+    """Open the sales database tuned for bulk loading."""
+    conn = sqlite3.connect(db_path)
+
+    # WAL + relaxed sync so the bulk insert pays for one fsync, not one per statement
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+    return conn
+
+
+def create_table_no_index(cursor):
+    """Create the table without PRIMARY KEY so the load is not slowed by index upkeep."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS user_purchase_behavior (
+        user_id INTEGER,
+        customer_id INTEGER,
+        has_purchased_product BOOLEAN NOT NULL,
+        purchase_likelihood REAL NOT NULL,
+        has_purchased_service BOOLEAN NOT NULL,
+        service_purchase_likelihood REAL NOT NULL,
+        last_interaction_date TEXT,
+        FOREIGN KEY (customer_id) REFERENCES customers (customer_id)
+    )
+    ''')
+
+
+def generate_rows(cursor, num_rows=NUM_ROWS):
+    """Yield purchase behavior rows, one vectorized draw per column."""
+    customer_ids = tuple(cid for (cid,) in cursor.execute("SELECT customer_id FROM customers"))
+
+    rng = np.random.default_rng()
+
+    user_ids = np.arange(1, num_rows + 1)
+    chosen_customer_ids = rng.choice(np.array(customer_ids), size=num_rows)
+    has_purchased_product = rng.integers(0, 2, num_rows)  # 0 for False, 1 for True
+    has_purchased_service = rng.integers(0, 2, num_rows)
+
     # Set purchase likelihood - higher if they've already purchased
-    purchase_likelihood = random.uniform(0.7, 0.95) if has_purchased_product else random.uniform(0.1, 0.6)
-    
-    has_purchased_service = random.choice([0, 1])
-    service_purchase_likelihood = random.uniform(0.7, 0.95) if has_purchased_service else random.uniform(0.1, 0.6)
-    
-    # Random date within the last 90 days
-    last_interaction_date = (datetime.now() - timedelta(days=random.randint(1, 90))).strftime("%Y-%m-%d")
-    
-    purchase_behavior_data.append((
-        i, 
-        customer_id, 
-        has_purchased_product, 
-        purchase_likelihood, 
-        has_purchased_service, 
-        service_purchase_likelihood, 
-        last_interaction_date
-    ))
-
-# Insert data into the table
-cursor.executemany(
-    "INSERT OR REPLACE INTO user_purchase_behavior VALUES (?, ?, ?, ?, ?, ?, ?)", 
-    purchase_behavior_data
-)
-
-# Commit changes
-conn.commit()
-
-# Verify data
-cursor.execute("SELECT COUNT(*) FROM user_purchase_behavior")
-print(f"User Purchase Behavior Records: {cursor.fetchone()[0]}")
-
-# Show sample data
-cursor.execute("""
-SELECT 
-    upb.user_id, 
-    c.name as customer_name, 
-    upb.has_purchased_product, 
-    upb.purchase_likelihood, 
-    upb.has_purchased_service, 
-    upb.service_purchase_likelihood, 
-    upb.last_interaction_date
-FROM user_purchase_behavior upb
-JOIN customers c ON upb.customer_id = c.customer_id
-LIMIT 5
-""")
-
-print("\nSample data:")
-rows = cursor.fetchall()
-for row in rows:
-    print(row)
-
-# Close connection
-conn.close()
-print("\nUser purchase behavior data added successfully!")
+    purchase_likelihood = np.where(
+        has_purchased_product, rng.uniform(0.7, 0.95, num_rows), rng.uniform(0.1, 0.6, num_rows)
+    )
+    service_purchase_likelihood = np.where(
+        has_purchased_service, rng.uniform(0.7, 0.95, num_rows), rng.uniform(0.1, 0.6, num_rows)
+    )
+
+    # Random dates within the last 90 days, formatted in one pass
+    base_date = datetime.now()
+    day_offsets = rng.integers(1, 91, num_rows)
+    last_interaction_dates = [
+        (base_date - timedelta(days=int(days))).strftime("%Y-%m-%d") for days in day_offsets
+    ]
+
+    # Generator: rows stream into the insert batches without a second
+    # full-dataset list alongside the column arrays
+    return (
+        (int(uid), int(cid), int(hp), float(pl), int(hs), float(sl), date)
+        for uid, cid, hp, pl, hs, sl, date in zip(
+            user_ids,
+            chosen_customer_ids,
+            has_purchased_product,
+            purchase_likelihood,
+            has_purchased_service,
+            service_purchase_likelihood,
+            last_interaction_dates,
+        )
+    )
+
+
+def bulk_insert(conn, cursor, rows):
+    """Insert all rows inside one explicit transaction so SQLite syncs once at COMMIT."""
+    cursor.execute("BEGIN IMMEDIATE")
+
+    # Pull batches off the row generator: never more than BATCH_SIZE rows
+    # buffered, one multi-row VALUES statement per full batch
+    full_batch_sql = (
+        "INSERT OR REPLACE INTO user_purchase_behavior VALUES "
+        + ",".join(["(?, ?, ?, ?, ?, ?, ?)"] * BATCH_SIZE)
+    )
+    rows_iter = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows_iter, BATCH_SIZE))
+        if not chunk:
+            break
+        if len(chunk) == BATCH_SIZE:
+            cursor.execute(full_batch_sql, list(itertools.chain.from_iterable(chunk)))
+        else:
+            # Leftover partial batch goes through a single reusable prepared statement
+            cursor.executemany(
+                "INSERT OR REPLACE INTO user_purchase_behavior VALUES (?, ?, ?, ?, ?, ?, ?)",
+                chunk,
+            )
+            break
+
+    conn.commit()
+
+
+def create_indexes(cursor):
+    """Build indexes after the load: one sorted bulk B-tree build instead of N rebalances."""
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_upb_pk ON user_purchase_behavior(user_id)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_upb_customer ON user_purchase_behavior(customer_id)"
+    )
+
+
+def verify(cursor):
+    cursor.execute("SELECT COUNT(*) FROM user_purchase_behavior")
+    print(f"User Purchase Behavior Records: {cursor.fetchone()[0]}")
+
+    # Show sample data
+    cursor.execute("""
+    SELECT
+        upb.user_id,
+        c.name as customer_name,
+        upb.has_purchased_product,
+        upb.purchase_likelihood,
+        upb.has_purchased_service,
+        upb.service_purchase_likelihood,
+        upb.last_interaction_date
+    FROM user_purchase_behavior upb
+    JOIN customers c ON upb.customer_id = c.customer_id
+    LIMIT 5
+    """)
+
+    print("\nSample data:")
+    rows = cursor.fetchall()
+    for row in rows:
+        print(row)
+
+
+def build_purchase_behavior(db_path='sales_database.db'):
+    """Load the purchase behavior table; callable in-process from the apps."""
+    conn = connect(db_path)
+    cursor = conn.cursor()
+
+    create_table_no_index(cursor)
+    bulk_insert(conn, cursor, generate_rows(cursor))
+    create_indexes(cursor)
+    conn.commit()
+
+    verify(cursor)
+    conn.close()
+    print("\nUser purchase behavior data added successfully!")
+
+
+if __name__ == "__main__":
+    build_purchase_behavior()
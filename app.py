@@ -1,3 +1,4 @@
+import io
 import os
 import subprocess
 import sys
@@ -13,6 +14,19 @@ from sql_agent import SQLAgent
 
 st.set_page_config(page_title="Local SQL Agent · DQE Prep", layout="wide")
 
+
+@st.cache_resource
+def build_sql_agent(db_path: str, llm_url: str, few_shot_path, dialect: str, domain: str, execute_sql: bool) -> SQLAgent:
+    """Build the agent once per configuration so reruns reuse the DB connection and schema."""
+    client = LLMClient(
+        base_url=llm_url,
+        few_shot_path=few_shot_path,
+        dialect=dialect,
+        domain=domain,
+    )
+    return SQLAgent(db_path, client, max_retries=2, execute_sql=execute_sql)
+
+
 ROOT = Path(__file__).parent
 SALES_DB = ROOT / "sales_database.db"
 PIPELINE_DB = ROOT / "pipeline_database.db"
@@ -60,14 +74,22 @@ dialect = st.sidebar.selectbox(
 )
 execute_sql = dialect == "sqlite"
 
+@st.cache_data(ttl=10)
+def llm_endpoint_status(url: str):
+    """Probe the LLM endpoint at most every 10s, not on every widget interaction."""
+    try:
+        return requests.get(f"{url.rstrip('/')}/v1/models", timeout=2).status_code
+    except requests.exceptions.RequestException:
+        return None
+
+
 llm_url = st.sidebar.text_input("LLM API URL", value=os.getenv("LLM_API_URL", "http://127.0.0.1:1234"))
-try:
-    response = requests.get(f"{llm_url.rstrip('/')}/v1/models", timeout=2)
-    if response.status_code == 200:
-        st.sidebar.success("LLM endpoint is reachable")
-    else:
-        st.sidebar.error(f"LLM endpoint returned status code {response.status_code}")
-except requests.exceptions.RequestException:
+status_code = llm_endpoint_status(llm_url)
+if status_code == 200:
+    st.sidebar.success("LLM endpoint is reachable")
+elif status_code is not None:
+    st.sidebar.error(f"LLM endpoint returned status code {status_code}")
+else:
     st.sidebar.error("LLM endpoint is not reachable. Load a model in LM Studio first.")
 
 default_examples = PIPELINE_EXAMPLES if is_pipeline else DQE_EXAMPLES
@@ -78,12 +100,15 @@ use_examples = st.sidebar.checkbox(
 )
 
 try:
-    llm_client = LLMClient(
-        base_url=llm_url,
-        few_shot_path=str(default_examples) if use_examples and default_examples.exists() else None,
-        dialect=dialect,
-        domain=domain,
+    sql_agent = build_sql_agent(
+        str(db_path),
+        llm_url,
+        str(default_examples) if use_examples and default_examples.exists() else None,
+        dialect,
+        domain,
+        execute_sql,
     )
+    llm_client = sql_agent.llm_client
     available_models = llm_client.list_models()
     if available_models:
         preferred = LLMClient.prefer_model(available_models) or llm_client.model_name
@@ -103,8 +128,6 @@ try:
         llm_client.model_name = st.sidebar.text_input("Model ID", value=llm_client.model_name)
 
     st.sidebar.caption("Thermal tip: one query at a time. Unload the model when finished.")
-
-    sql_agent = SQLAgent(str(db_path), llm_client, max_retries=2, execute_sql=execute_sql)
 except Exception as e:
     st.error(f"Error initializing SQL Agent: {str(e)}")
     st.stop()
@@ -148,7 +171,17 @@ if st.button("Run Query", type="primary"):
     else:
         with st.spinner("Processing query..."):
             try:
-                response = sql_agent.process_query(query)
+                # Stream raw model output as it arrives so time-to-first-token
+                # is visible instead of a blank spinner for the whole generation.
+                stream_box = st.empty()
+                stream_buffer = []
+
+                def show_token(token: str) -> None:
+                    stream_buffer.append(token)
+                    stream_box.code("".join(stream_buffer))
+
+                response = sql_agent.process_query(query, on_token=show_token)
+                stream_box.empty()
 
                 st.subheader("Generated SQL")
                 st.code(response.generated_sql, language="sql")
@@ -181,9 +214,13 @@ if st.button("Run Query", type="primary"):
                         st.caption(f"Returned {response.query_result.row_count} rows")
                         if "Verification:" in (response.explanation or ""):
                             st.success("Post-exec verification annotations were added to the explanation.")
+                        # Serialize in chunks to bytes: avoids one giant
+                        # intermediate Python string for large result sets.
+                        csv_buffer = io.BytesIO()
+                        df.to_csv(csv_buffer, index=False, encoding="utf-8", chunksize=10_000)
                         st.download_button(
                             label="Download results as CSV",
-                            data=df.to_csv(index=False),
+                            data=csv_buffer.getvalue(),
                             file_name="query_results.csv",
                             mime="text/csv",
                         )
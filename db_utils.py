@@ -2,35 +2,60 @@
 """
 Utility functions for database management
 """
+import csv
+import functools
 import sqlite3
-import pandas as pd
 import os
 import sys
 import json
 from typing import List, Dict, Any, Optional, Union, Tuple
 
+# pandas is imported lazily inside the functions that need it so CLI commands
+# like export_schema don't pay its import cost
+
+@functools.lru_cache(maxsize=8)
+def _get_conn(db_path: str) -> sqlite3.Connection:
+    """Open (or reuse) a cached connection so helpers stop thrashing .db/.db-wal files"""
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
 def connect_to_db(db_path: str) -> Tuple[sqlite3.Connection, sqlite3.Cursor]:
     """Connect to SQLite database and return connection and cursor"""
     try:
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        conn = _get_conn(db_path)
         cursor = conn.cursor()
         return conn, cursor
     except sqlite3.Error as e:
         print(f"Error connecting to database: {str(e)}")
         sys.exit(1)
 
+def _validate_table_name(cursor: sqlite3.Cursor, table_name: str) -> None:
+    """Reject table names not present in sqlite_master before any f-string interpolation"""
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name = ?", (table_name,)
+    )
+    if cursor.fetchone() is None:
+        raise ValueError(f"Unknown table: {table_name}")
+
 def get_table_info(cursor: sqlite3.Cursor, table_name: str) -> Dict[str, Any]:
     """Get detailed information about a table"""
+    _validate_table_name(cursor, table_name)
+
     table_info = {
         "name": table_name,
         "columns": [],
         "sample_data": [],
         "row_count": 0
     }
-    
-    # Get column information
-    cursor.execute(f"PRAGMA table_info({table_name});")
+
+    # Get column information; the table-valued form takes a real parameter,
+    # so one cached statement serves every table
+    cursor.execute(
+        'SELECT name, type, pk, "notnull", dflt_value FROM pragma_table_info(?);',
+        (table_name,),
+    )
     columns = cursor.fetchall()
     
     for col in columns:
@@ -47,77 +72,134 @@ def get_table_info(cursor: sqlite3.Cursor, table_name: str) -> Dict[str, Any]:
     cursor.execute(f"SELECT COUNT(*) FROM {table_name};")
     table_info["row_count"] = cursor.fetchone()[0]
     
-    # Get sample data (first 5 rows)
+    # Get sample data (first 5 rows); zip against the known column order so
+    # each row is one tuple copy rather than per-column name lookups
     cursor.execute(f"SELECT * FROM {table_name} LIMIT 5;")
-    rows = cursor.fetchall()
-    
-    for row in rows:
-        row_data = {}
-        for col in table_info["columns"]:
-            col_name = col["name"]
-            row_data[col_name] = row[col_name]
-        table_info["sample_data"].append(row_data)
-    
+    col_names = [col["name"] for col in table_info["columns"]]
+    table_info["sample_data"] = [
+        dict(zip(col_names, tuple(row))) for row in cursor.fetchall()
+    ]
+
     return table_info
 
-def export_query_to_csv(db_path: str, sql_query: str, output_path: str) -> None:
-    """Execute a SQL query and export results to CSV"""
+def export_query_to_csv(db_path: str, sql_query: str, output_path: str, chunksize: int = 50_000) -> None:
+    """Execute a SQL query and stream results to CSV in bounded-memory chunks"""
+    import pandas as pd
+
     try:
-        conn = sqlite3.connect(db_path)
-        df = pd.read_sql_query(sql_query, conn)
-        df.to_csv(output_path, index=False)
-        print(f"Exported {len(df)} rows to {output_path}")
+        conn = _get_conn(db_path)
+        total_rows = 0
+        for i, df_chunk in enumerate(pd.read_sql_query(sql_query, conn, chunksize=chunksize)):
+            df_chunk.to_csv(
+                output_path,
+                index=False,
+                header=(i == 0),
+                mode="w" if i == 0 else "a",
+            )
+            total_rows += len(df_chunk)
+        print(f"Exported {total_rows} rows to {output_path}")
     except Exception as e:
         print(f"Error exporting to CSV: {str(e)}")
-    finally:
-        if conn:
-            conn.close()
 
 def import_csv_to_table(db_path: str, csv_path: str, table_name: str, if_exists: str = "replace") -> None:
-    """Import data from CSV file into a database table"""
+    """Import data from CSV file into a database table via streaming executemany"""
     try:
-        # Read CSV file
-        df = pd.read_csv(csv_path)
-        
-        # Connect to database
-        conn = sqlite3.connect(db_path)
-        
-        # Import data
-        df.to_sql(table_name, conn, if_exists=if_exists, index=False)
-        
-        print(f"Imported {len(df)} rows from {csv_path} to table {table_name}")
+        conn = _get_conn(db_path)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-200000")
+
+        with open(csv_path, newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            columns = ", ".join(header)
+            placeholders = ", ".join("?" * len(header))
+
+            if if_exists == "replace":
+                conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+            col_defs = ", ".join(f"{col} TEXT" for col in header)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table_name} ({col_defs})")
+
+            # Stream rows straight from the csv reader inside one transaction:
+            # no DataFrame allocation, no per-row commit
+            conn.execute("BEGIN")
+            cursor = conn.executemany(
+                f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})", reader
+            )
+            row_count = cursor.rowcount
+            conn.commit()
+
+        print(f"Imported {row_count} rows from {csv_path} to table {table_name}")
     except Exception as e:
         print(f"Error importing from CSV: {str(e)}")
-    finally:
-        if conn:
-            conn.close()
+
+@functools.lru_cache(maxsize=8)
+def _get_full_schema(db_path: str, mtime: float) -> Dict[str, Any]:
+    """Introspect every table once; mtime in the key invalidates on database writes"""
+    conn, cursor = connect_to_db(db_path)
+
+    # One joined scan over pragma_table_info instead of a PRAGMA per table
+    cursor.execute(
+        """
+        SELECT m.name AS table_name, p.name, p.type, p.pk, p."notnull", p.dflt_value
+        FROM sqlite_master m JOIN pragma_table_info(m.name) p
+        WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+        ORDER BY m.name, p.cid;
+        """
+    )
+    schema: Dict[str, Any] = {}
+    for row in cursor.fetchall():
+        table_info = schema.setdefault(
+            row["table_name"],
+            {"name": row["table_name"], "columns": [], "sample_data": [], "row_count": 0},
+        )
+        table_info["columns"].append(
+            {
+                "name": row["name"],
+                "type": row["type"],
+                "primary_key": bool(row["pk"]),
+                "nullable": not bool(row["notnull"]),
+                "default": row["dflt_value"],
+            }
+        )
+
+    if schema:
+        # Batch all row counts into a single UNION ALL statement
+        counts_sql = " UNION ALL ".join(
+            f"SELECT '{table}' AS t, COUNT(*) AS n FROM {table}" for table in schema
+        )
+        for row in cursor.execute(counts_sql):
+            schema[row["t"]]["row_count"] = row["n"]
+
+    for table, table_info in schema.items():
+        cursor.execute(f"SELECT * FROM {table} LIMIT 5;")
+        col_names = [col["name"] for col in table_info["columns"]]
+        table_info["sample_data"] = [
+            dict(zip(col_names, tuple(row))) for row in cursor.fetchall()
+        ]
+
+    return schema
+
+def get_full_schema(db_path: str) -> Dict[str, Any]:
+    """Get schema info for all tables, cached until the database file changes"""
+    return _get_full_schema(db_path, os.path.getmtime(db_path))
 
 def export_table_schema(db_path: str, output_path: str) -> None:
     """Export database schema to a JSON file"""
     try:
-        conn, cursor = connect_to_db(db_path)
-        
-        # Get all tables
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';")
-        tables = [row[0] for row in cursor.fetchall()]
-        
-        schema = {}
-        for table in tables:
-            schema[table] = get_table_info(cursor, table)
-        
+        schema = get_full_schema(db_path)
+
         # Export to JSON file
         with open(output_path, 'w') as f:
             json.dump(schema, f, indent=2)
-        
+
         print(f"Exported schema to {output_path}")
     except Exception as e:
         print(f"Error exporting schema: {str(e)}")
-    finally:
-        if conn:
-            conn.close()
 
 def run_interactive_query(db_path: str) -> None:
     """Run an interactive SQL query session"""
+    import pandas as pd
+
     conn, cursor = connect_to_db(db_path)
     
     print("\nInteractive SQL Query Session")
@@ -173,9 +255,9 @@ def run_interactive_query(db_path: str) -> None:
                 
                 # Get column names
                 columns = [desc[0] for desc in cursor.description]
-                
-                # Convert to DataFrame for nice display
-                df = pd.DataFrame([dict(row) for row in rows])
+
+                # Feed the raw row tuples straight to pandas: no per-row dicts
+                df = pd.DataFrame.from_records(rows, columns=columns)
                 print(f"\nResults ({len(rows)} rows):")
                 print(df.to_string())
                 
@@ -192,8 +274,8 @@ def run_interactive_query(db_path: str) -> None:
         
         except Exception as e:
             print(f"Error executing query: {str(e)}")
-    
-    conn.close()
+
+    # Connection stays in the cache for reuse by other helpers
     print("\nSession ended")
 
 if __name__ == "__main__":
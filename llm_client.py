@@ -1,11 +1,31 @@
+import asyncio
+import functools
+import hashlib
 import json
 import os
 import re
+import sqlite3
+import threading
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter, Retry
+
+
+@functools.cache
+def _load_env_once() -> bool:
+    """Scan for .env a single time per process, not per LLMClient instance."""
+    return load_dotenv()
+
+try:
+    # ~3-5x faster than stdlib json on LLM payloads; fall back silently if absent.
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
 
 
 # Default stack for 24GB Apple Silicon: Gemma 4 12B QAT only.
@@ -15,6 +35,17 @@ PREFERRED_MODEL_SUBSTRINGS = [
     "gemma-4",
 ]
 
+# Compiled once: every LLM response goes through these, so avoid repeated
+# full-string split()/upper() scans in the extraction fallbacks.
+_JSON_BLOCK_RE = re.compile(r"```json\s*(\{.*?\})\s*```", re.DOTALL | re.IGNORECASE)
+_CODE_BLOCK_RE = re.compile(r"```(?:sql)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+_BARE_JSON_RE = re.compile(r"\{.*\}", re.DOTALL)
+_SQL_LINE_RE = re.compile(r"\b(SELECT|WITH|COPY|UPDATE|INSERT)\b", re.IGNORECASE)
+
+# Repeat questions (example buttons, eval reruns) skip the multi-second LLM
+# round-trip entirely; the disk tier survives Streamlit process restarts.
+_SQL_CACHE_PATH = Path(os.path.expanduser("~/.cache/sql_agent")) / "llm_cache.sqlite"
+
 
 class LLMClient:
     """Client for local models served through an OpenAI-compatible API."""
@@ -27,7 +58,7 @@ class LLMClient:
         dialect: str = "sqlite",
         domain: str = "sales",
     ):
-        load_dotenv()
+        _load_env_once()
 
         self.base_url = (base_url or os.getenv("LLM_API_URL", "http://127.0.0.1:1234")).rstrip("/")
         self.chat_endpoint = f"{self.base_url}/v1/chat/completions"
@@ -35,6 +66,21 @@ class LLMClient:
         self.dialect = (dialect or os.getenv("SQL_DIALECT", "sqlite")).lower()
         self.domain = (domain or os.getenv("SQL_AGENT_DOMAIN", "sales")).lower()
         self.few_shot_examples = self._load_few_shot_examples(few_shot_path)
+        # One keep-alive session for every call to the local server: skips the
+        # TCP handshake per request and reuses the pooled socket.
+        self._session = requests.Session()
+        self._session.headers.update({"Content-Type": "application/json"})
+        # Pooled keep-alive sockets plus idempotent-request retries; POSTs are
+        # not retried so a slow generation never fires twice.
+        self._session.mount(
+            "http://",
+            HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=Retry(total=2)),
+        )
+        self._sql_cache: Dict[str, Dict[str, str]] = {}
+        self._sql_cache_conn: Optional[sqlite3.Connection] = None
+        # Streamlit reruns and asyncio.to_thread workers hit the disk cache
+        # from different threads; the lock serializes access and lazy init.
+        self._sql_cache_lock = threading.Lock()
         configured = model_name or os.getenv("LLM_MODEL")
         self.model_name = configured or self.prefer_model(self.list_models()) or "gemma-4-12b-it-qat"
 
@@ -53,9 +99,9 @@ class LLMClient:
     def list_models(self) -> List[str]:
         """Return locally loaded model IDs from LM Studio or Ollama's OpenAI API."""
         try:
-            response = requests.get(self.models_endpoint, timeout=2)
+            response = self._session.get(self.models_endpoint, timeout=2)
             response.raise_for_status()
-            return [item["id"] for item in response.json().get("data", []) if item.get("id")]
+            return [item["id"] for item in _loads(response.content).get("data", []) if item.get("id")]
         except requests.exceptions.RequestException:
             return []
 
@@ -68,7 +114,7 @@ class LLMClient:
         for line in path.read_text(encoding="utf-8").splitlines():
             if not line.strip():
                 continue
-            item = json.loads(line)
+            item = _loads(line)
             question = item.get("question") or item.get("sql_prompt")
             sql = item.get("sql")
             if not question or not sql:
@@ -121,6 +167,7 @@ class LLMClient:
         messages: List[Dict[str, str]],
         temperature: float = 0.7,
         max_tokens: int = 2048,
+        on_token=None,
     ) -> Dict[str, Any]:
         # Local reasoning models often spend hundreds of tokens in reasoning_content
         # before emitting the final answer; keep max_tokens high enough for both.
@@ -130,18 +177,65 @@ class LLMClient:
             "temperature": temperature,
             "max_tokens": max_tokens,
         }
+        if on_token is not None:
+            return self._stream_completion(payload, on_token)
 
         try:
-            response = requests.post(self.chat_endpoint, json=payload, timeout=300)
+            response = self._session.post(self.chat_endpoint, json=payload, timeout=300)
             if not response.ok:
                 detail = response.text[:500]
                 raise Exception(
                     f"Error communicating with LLM API: {response.status_code} {response.reason}: {detail}"
                 )
-            return response.json()
+            return _loads(response.content)
         except requests.exceptions.RequestException as e:
             raise Exception(f"Error communicating with LLM API: {str(e)}")
 
+    def _stream_completion(self, payload: Dict[str, Any], on_token) -> Dict[str, Any]:
+        """SSE-stream the completion, invoking on_token per delta.
+
+        Returns a response dict shaped like the non-streaming API so callers
+        can keep extracting from choices[0].message.content.
+        """
+        payload = {**payload, "stream": True}
+        chunks: List[str] = []
+        reasoning_chunks: List[str] = []
+        try:
+            response = self._session.post(self.chat_endpoint, json=payload, stream=True, timeout=300)
+            if not response.ok:
+                detail = response.text[:500]
+                raise Exception(
+                    f"Error communicating with LLM API: {response.status_code} {response.reason}: {detail}"
+                )
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                if line.startswith(b"data: "):
+                    line = line[6:]
+                if line.strip() == b"[DONE]":
+                    break
+                event = _loads(line)
+                choices = event.get("choices") or []
+                if not choices:
+                    continue
+                delta = choices[0].get("delta") or {}
+                text = delta.get("content") or ""
+                if text:
+                    chunks.append(text)
+                    on_token(text)
+                    continue
+                # Reasoning models stream thinking tokens on a separate channel;
+                # keep them apart so they never leak into the final answer.
+                reasoning = delta.get("reasoning_content") or ""
+                if reasoning:
+                    reasoning_chunks.append(reasoning)
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Error communicating with LLM API: {str(e)}")
+        message = {"content": "".join(chunks)}
+        if reasoning_chunks:
+            message["reasoning_content"] = "".join(reasoning_chunks)
+        return {"choices": [{"message": message}]}
+
     @staticmethod
     def _message_text(message: Dict[str, Any]) -> str:
         """Prefer final content; fall back to reasoning channels used by local models."""
@@ -154,83 +248,64 @@ class LLMClient:
                 return value.strip()
         return ""
 
+    @staticmethod
+    def _sql_result_from_json(payload: str) -> Optional[Dict[str, str]]:
+        """Parse a candidate JSON payload into a normalized sql_query result, or None."""
+        try:
+            result = _loads(payload)
+        except Exception:
+            return None
+        if not isinstance(result, dict) or "sql_query" not in result:
+            return None
+        return LLMClient._normalize_sql_result(
+            {
+                "sql_query": result.get("sql_query", ""),
+                "explanation": result.get("explanation", ""),
+            }
+        )
+
     def _extract_sql_from_response(self, content: str) -> Dict[str, str]:
         content = self._strip_reasoning(content)
 
-        if "```json" in content:
-            try:
-                json_content = content.split("```json")[1].split("```")[0].strip()
-                result = json.loads(json_content)
-                if "sql_query" in result:
-                    return LLMClient._normalize_sql_result(
-                        {
-                            "sql_query": result.get("sql_query", ""),
-                            "explanation": result.get("explanation", ""),
-                        }
-                    )
-            except Exception:
-                pass
-
-        elif "```" in content:
-            try:
-                code_content = content.split("```")[1].split("```")[0].strip()
-                if code_content.lower().startswith("sql"):
-                    sql_query = code_content[3:].strip()
-                else:
-                    sql_query = code_content
-                # If fenced block is JSON, parse it.
-                if sql_query.lstrip().startswith("{"):
-                    parsed = json.loads(sql_query)
-                    if "sql_query" in parsed:
-                        return LLMClient._normalize_sql_result(
-                            {
-                                "sql_query": parsed.get("sql_query", ""),
-                                "explanation": parsed.get("explanation", ""),
-                            }
-                        )
-                return LLMClient._normalize_sql_result(
+        json_block = _JSON_BLOCK_RE.search(content)
+        if json_block:
+            parsed = self._sql_result_from_json(json_block.group(1))
+            if parsed:
+                return parsed
+
+        code_block = _CODE_BLOCK_RE.search(content)
+        if code_block:
+            sql_query = code_block.group(1).strip()
+            if sql_query.lower().startswith("sql"):
+                sql_query = sql_query[3:].strip()
+            # If fenced block is JSON, parse it.
+            if sql_query.lstrip().startswith("{"):
+                parsed = self._sql_result_from_json(sql_query)
+                if parsed:
+                    return parsed
+            if sql_query:
+                return self._normalize_sql_result(
                     {
                         "sql_query": sql_query,
                         "explanation": "Extracted SQL query from code block",
                     }
                 )
-            except Exception:
-                pass
 
-        try:
-            start_idx = content.find("{")
-            end_idx = content.rfind("}") + 1
-            if start_idx >= 0 and end_idx > start_idx:
-                result = json.loads(content[start_idx:end_idx])
-                if "sql_query" in result:
-                    return LLMClient._normalize_sql_result(
-                        {
-                            "sql_query": result.get("sql_query", ""),
-                            "explanation": result.get("explanation", ""),
-                        }
-                    )
-        except Exception:
-            pass
+        bare_json = _BARE_JSON_RE.search(content)
+        if bare_json:
+            parsed = self._sql_result_from_json(bare_json.group(0))
+            if parsed:
+                return parsed
 
-        try:
-            result = json.loads(content)
-            if "sql_query" in result:
-                return LLMClient._normalize_sql_result(
-                    {
-                        "sql_query": result.get("sql_query", ""),
-                        "explanation": result.get("explanation", ""),
-                    }
-                )
-        except Exception:
-            pass
+        parsed = self._sql_result_from_json(content)
+        if parsed:
+            return parsed
 
-        if "SELECT" in content.upper() or "WITH" in content.upper() or "COPY" in content.upper():
-            lines = content.split("\n")
+        if _SQL_LINE_RE.search(content):
             sql_lines = []
             capture = False
-            for line in lines:
-                upper = line.upper()
-                if any(token in upper for token in ("SELECT", "WITH", "COPY", "UPDATE", "INSERT")) or capture:
+            for line in content.split("\n"):
+                if capture or _SQL_LINE_RE.search(line):
                     capture = True
                     sql_lines.append(line)
                     if ";" in line:
@@ -322,7 +397,73 @@ class LLMClient:
         - Never generate INSERT, UPDATE, DELETE, DROP, ALTER, CREATE, ATTACH, or PRAGMA
         """
 
-    def generate_sql(self, query: str, schema_info: str, error_message: str = None) -> Dict[str, str]:
+    def _cache_key(self, query: str, schema_info: str, *extra: str) -> str:
+        digest = hashlib.blake2b(
+            f"{self.model_name}|{self.dialect}|{self.domain}|{query}".encode()
+        )
+        digest.update(schema_info.encode())
+        for part in extra:
+            digest.update(b"|")
+            digest.update(part.encode())
+        return digest.hexdigest()
+
+    def _get_cache_conn(self) -> Optional[sqlite3.Connection]:
+        # Callers hold _sql_cache_lock, which also makes lazy init race-free.
+        if self._sql_cache_conn is None:
+            try:
+                _SQL_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+                # check_same_thread=False: the connection outlives the thread
+                # that created it; the lock serializes actual use.
+                conn = sqlite3.connect(_SQL_CACHE_PATH, check_same_thread=False)
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS sql_cache (key TEXT PRIMARY KEY, value TEXT)"
+                )
+                self._sql_cache_conn = conn
+            except (OSError, sqlite3.Error):
+                # Cache is best-effort; generation still works without it.
+                return None
+        return self._sql_cache_conn
+
+    def _cached_sql(self, key: str) -> Optional[Dict[str, str]]:
+        cached = self._sql_cache.get(key)
+        if cached:
+            return dict(cached)
+        with self._sql_cache_lock:
+            conn = self._get_cache_conn()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute("SELECT value FROM sql_cache WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error:
+                return None
+        if not row:
+            return None
+        result = _loads(row[0])
+        self._sql_cache[key] = result
+        return dict(result)
+
+    def _store_sql(self, key: str, result: Dict[str, str]) -> None:
+        self._sql_cache[key] = dict(result)
+        with self._sql_cache_lock:
+            conn = self._get_cache_conn()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sql_cache VALUES (?, ?)", (key, json.dumps(result))
+                )
+                conn.commit()
+            except sqlite3.Error:
+                pass
+
+    def generate_sql(self, query: str, schema_info: str, error_message: str = None, on_token=None) -> Dict[str, str]:
+        # Retries carry their error context in the key so a repeated identical
+        # failure (eval reruns, example buttons) still skips the model.
+        cache_key = self._cache_key(query, schema_info, error_message or "")
+        cached = self._cached_sql(cache_key)
+        if cached:
+            return cached
+
         examples = self._few_shot_context(query)
         system_message = f"""You are an expert SQL agent that converts natural language into accurate SQL on the first attempt.
 
@@ -363,15 +504,33 @@ class LLMClient:
 
         try:
             # Keep completions shorter for mid-size local models (faster, cooler).
-            response = self.get_completion(messages, temperature=0.1, max_tokens=1024)
+            response = self.get_completion(messages, temperature=0.1, max_tokens=1024, on_token=on_token)
             content = self._message_text(response["choices"][0]["message"])
-            return self._extract_sql_from_response(content)
+            result = self._extract_sql_from_response(content)
+            if cache_key and result.get("sql_query"):
+                self._store_sql(cache_key, result)
+            return result
         except Exception as e:
             return {
                 "sql_query": "",
                 "explanation": f"Error generating SQL: {str(e)}",
             }
 
+    async def agenerate_sql(self, query: str, schema_info: str, error_message: str = None) -> Dict[str, str]:
+        """Async generate_sql: offloads the blocking HTTP wait to a worker thread
+        so several generations can overlap under asyncio.gather."""
+        return await asyncio.to_thread(self.generate_sql, query, schema_info, error_message)
+
+    async def aimprove_sql(
+        self,
+        query: str,
+        schema_info: str,
+        original_sql: str,
+        error_message: str,
+    ) -> Dict[str, str]:
+        """Async improve_sql counterpart of agenerate_sql."""
+        return await asyncio.to_thread(self.improve_sql, query, schema_info, original_sql, error_message)
+
     def improve_sql(
         self,
         query: str,
@@ -379,6 +538,11 @@ class LLMClient:
         original_sql: str,
         error_message: str,
     ) -> Dict[str, str]:
+        cache_key = self._cache_key(query, schema_info, original_sql, error_message)
+        cached = self._cached_sql(cache_key)
+        if cached:
+            return cached
+
         system_message = f"""You are an expert SQL agent that fixes broken SQL queries.
 
         Database schema:
@@ -411,7 +575,10 @@ class LLMClient:
         try:
             response = self.get_completion(messages, temperature=0.1, max_tokens=768)
             content = self._message_text(response["choices"][0]["message"])
-            return self._extract_sql_from_response(content)
+            result = self._extract_sql_from_response(content)
+            if result.get("sql_query"):
+                self._store_sql(cache_key, result)
+            return result
         except Exception as e:
             return {
                 "sql_query": "",
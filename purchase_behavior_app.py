@@ -1,8 +1,6 @@
+import io
 import streamlit as st
-import pandas as pd
 import os
-import subprocess
-import sys
 import traceback
 from dotenv import load_dotenv
 
@@ -15,6 +13,26 @@ load_dotenv()
 # Page configuration
 st.set_page_config(page_title="SQL Agent - User Purchase Behavior", layout="wide")
 
+
+@st.cache_resource
+def get_agent(db_path: str, llm_url: str, max_retries: int) -> SQLAgent:
+    """Build the agent once per configuration; reruns reuse the connection and schema."""
+    return SQLAgent(db_path, LLMClient(base_url=llm_url), max_retries=max_retries)
+
+
+@st.cache_data(ttl=30)
+def probe_llm_models(llm_url: str):
+    """Health-check the LLM endpoint at most every 30s, not on every rerun."""
+    import requests
+    try:
+        response = requests.get(f"{llm_url}/v1/models", timeout=2)
+        if response.status_code != 200:
+            return response.status_code, None
+        models = response.json().get('data', [])
+        return 200, [model.get('id') for model in models]
+    except requests.exceptions.RequestException:
+        return None, None
+
 # Sidebar
 st.sidebar.title("SQL Agent")
 st.sidebar.info(
@@ -25,14 +43,18 @@ st.sidebar.info(
 # Database file path
 DB_PATH = "sales_database.db"
 
-# Check if database exists, create it if it doesn't
+# Check if database exists, create it if it doesn't — in-process, so we skip
+# two interpreter cold-starts and keep the warm module cache
 if not os.path.exists(DB_PATH):
     st.sidebar.warning("Database not found. Setting up the database...")
     try:
-        subprocess.run([sys.executable, "setup_database.py"], check=True)
-        subprocess.run([sys.executable, "add_user_purchase_data.py"], check=True)
+        from setup_database import build_database
+        from add_user_purchase_data import build_purchase_behavior
+
+        build_database(DB_PATH)
+        build_purchase_behavior(DB_PATH)
         st.sidebar.success("Database setup complete!")
-    except subprocess.CalledProcessError as e:
+    except Exception as e:
         st.sidebar.error(f"Error setting up database: {str(e)}")
 
 # LLM Client configuration
@@ -43,25 +65,21 @@ st.sidebar.caption("Make sure your LLM Studio is running at this URL")
 max_retries = st.sidebar.slider("Max SQL improvement attempts", min_value=1, max_value=5, value=3)
 
 # Check if the LLM endpoint is reachable
-import requests
-try:
-    response = requests.get(f"{llm_url}/v1/models", timeout=2)
-    if response.status_code == 200:
-        models = response.json().get('data', [])
-        model_names = [model.get('id') for model in models]
-        if 'deepseek-r1-distill-qwen-14b' in model_names:
-            st.sidebar.success(" deepseek-r1-distill-qwen-14b model is available")
-        else:
-            st.sidebar.warning(" deepseek-r1-distill-qwen-14b model not found. Available models: " + ", ".join(model_names))
+status_code, model_names = probe_llm_models(llm_url)
+if status_code == 200:
+    if 'deepseek-r1-distill-qwen-14b' in model_names:
+        st.sidebar.success(" deepseek-r1-distill-qwen-14b model is available")
     else:
-        st.sidebar.error(f"LLM endpoint returned status code {response.status_code}")
-except requests.exceptions.RequestException:
+        st.sidebar.warning(" deepseek-r1-distill-qwen-14b model not found. Available models: " + ", ".join(model_names))
+elif status_code is not None:
+    st.sidebar.error(f"LLM endpoint returned status code {status_code}")
+else:
     st.sidebar.error("LLM endpoint is not reachable. Make sure LLM Studio is running.")
 
 # Initialize the LLM client and SQL Agent
 try:
-    llm_client = LLMClient(base_url=llm_url)
-    sql_agent = SQLAgent(DB_PATH, llm_client, max_retries=max_retries)
+    sql_agent = get_agent(DB_PATH, llm_url, max_retries)
+    llm_client = sql_agent.llm_client
 except Exception as e:
     st.error(f"Error initializing SQL Agent: {str(e)}")
     st.stop()
@@ -93,8 +111,22 @@ if st.button("Run Query"):
     else:
         with st.spinner("Processing query..."):
             try:
+                # Deferred: pandas costs a few hundred ms of first-paint time
+                # and is only needed once results come back
+                import pandas as pd
+
+                # Stream raw model output as it arrives instead of a blank
+                # spinner for the whole generation.
+                stream_box = st.empty()
+                stream_buffer = []
+
+                def show_token(token: str) -> None:
+                    stream_buffer.append(token)
+                    stream_box.code("".join(stream_buffer))
+
                 # Process the query
-                response = sql_agent.process_query(query)
+                response = sql_agent.process_query(query, on_token=show_token)
+                stream_box.empty()
                 
                 # Display the generated SQL
                 st.subheader("Generated SQL:")
@@ -129,34 +161,31 @@ if st.button("Run Query"):
                         st.dataframe(df)
                         st.caption(f"Returned {response.query_result.row_count} rows")
                         
-                        # Option to download results as CSV
-                        csv = df.to_csv(index=False)
+                        # Option to download results as CSV. Serialize into a
+                        # bytes buffer in chunks: no intermediate full-result
+                        # str and no second encode copy.
+                        csv_buffer = io.BytesIO()
+                        df.to_csv(csv_buffer, index=False, encoding="utf-8", chunksize=10_000)
                         st.download_button(
                             label="Download results as CSV",
-                            data=csv,
+                            data=csv_buffer.getvalue(),
                             file_name="query_results.csv",
                             mime="text/csv"
                         )
                         
-                        # Visualize data if it contains purchase likelihood
-                        if 'purchase_likelihood' in df.columns or 'service_purchase_likelihood' in df.columns:
+                        # Visualize data if it contains purchase likelihood:
+                        # one slice + index assignment covers every column combination
+                        likelihood_cols = [
+                            c for c in ('purchase_likelihood', 'service_purchase_likelihood')
+                            if c in df.columns
+                        ]
+                        if likelihood_cols:
                             st.subheader("Visualization:")
-                            
-                            if 'purchase_likelihood' in df.columns and 'service_purchase_likelihood' in df.columns:
-                                chart_data = df[['purchase_likelihood', 'service_purchase_likelihood']]
-                                if 'customer_name' in df.columns or 'name' in df.columns:
-                                    chart_data.index = df['customer_name'] if 'customer_name' in df.columns else df['name']
-                                st.bar_chart(chart_data)
-                            elif 'purchase_likelihood' in df.columns:
-                                chart_data = df[['purchase_likelihood']]
-                                if 'customer_name' in df.columns or 'name' in df.columns:
-                                    chart_data.index = df['customer_name'] if 'customer_name' in df.columns else df['name']
-                                st.bar_chart(chart_data)
-                            elif 'service_purchase_likelihood' in df.columns:
-                                chart_data = df[['service_purchase_likelihood']]
-                                if 'customer_name' in df.columns or 'name' in df.columns:
-                                    chart_data.index = df['customer_name'] if 'customer_name' in df.columns else df['name']
-                                st.bar_chart(chart_data)
+                            chart_data = df[likelihood_cols]
+                            label_col = next((c for c in ('customer_name', 'name') if c in df.columns), None)
+                            if label_col:
+                                chart_data.index = df[label_col]
+                            st.bar_chart(chart_data)
                         
             except Exception as e:
                 st.error(f"Error processing query: {str(e)}")
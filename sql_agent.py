@@ -1,6 +1,9 @@
+import asyncio
+import functools
 import json
 import re
 import sqlite3
+import threading
 from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 from models import SQLAgentResponse, SQLGenerationRequest, SQLGenerationResponse, SQLQueryResult
@@ -31,47 +34,101 @@ class SQLAgent:
         self.cursor = None
         self.max_retries = max_retries
         self.execute_sql_enabled = execute_sql
+        # Serializes execute/fetch windows on the shared connection:
+        # aprocess_queries runs process_query on several worker threads.
+        self._db_lock = threading.Lock()
         self._connect_to_db()
+        self._schema_version = self._get_schema_version()
         self.schema_info = self._get_schema_info()
+        # Safe to memoize: this connection is read-only, so identical SQL
+        # (example buttons, eval reruns) always yields identical results.
+        self._cached_select = functools.lru_cache(maxsize=128)(self._execute_select)
 
     def _connect_to_db(self) -> None:
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            # Read-only URI mode backs up the regex safety net at the engine
+            # level and lets SQLite skip write locking; the bigger statement
+            # cache keeps repair-loop re-executions out of the parser.
+            # check_same_thread=False because Streamlit reruns on fresh threads.
+            self.conn = sqlite3.connect(
+                f"file:{self.db_path}?mode=ro",
+                uri=True,
+                check_same_thread=False,
+                cached_statements=256,
+            )
             self.conn.row_factory = sqlite3.Row
+            self.conn.execute("PRAGMA query_only=1")
+            # Read-mostly tuning: mmap the file so repeated scans hit the OS
+            # page cache without read() syscalls, and keep a generous page
+            # cache plus in-memory temp tables for sorts/CTEs.
+            # (journal_mode=WAL is set by the loaders; it cannot be changed
+            # on a read-only connection.)
+            self.conn.execute("PRAGMA mmap_size=268435456")
+            self.conn.execute("PRAGMA cache_size=-65536")
+            self.conn.execute("PRAGMA temp_store=MEMORY")
             self.cursor = self.conn.cursor()
         except sqlite3.Error as e:
             raise Exception(f"Database connection error: {str(e)}")
 
+    def _get_schema_version(self) -> int:
+        return self.cursor.execute("PRAGMA schema_version").fetchone()[0]
+
+    def refresh_schema_info(self) -> str:
+        """Rebuild schema_info only if the schema actually changed.
+
+        PRAGMA schema_version is a single header read, so callers can invoke
+        this on every rerun and pay the full introspection cost only after a
+        CREATE/ALTER/DROP bumped the version.
+        """
+        version = self._get_schema_version()
+        if version != self._schema_version:
+            self._schema_version = version
+            self.schema_info = self._get_schema_info()
+        return self.schema_info
+
+    @staticmethod
+    def _truncate_value(value: Any) -> Any:
+        if isinstance(value, str) and len(value) > 80:
+            return value[:77] + "..."
+        return value
+
     def _get_schema_info(self) -> str:
         try:
-            self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-            tables = [row[0] for row in self.cursor.fetchall() if not row[0].startswith("sqlite_")]
+            # One joined scan over pragma_table_info: 1 statement for all
+            # columns instead of a PRAGMA round-trip per table.
+            self.cursor.execute(
+                """
+                SELECT m.name AS table_name, p.name, p.type, p.pk
+                FROM sqlite_master m JOIN pragma_table_info(m.name) p
+                WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+                ORDER BY m.name, p.cid;
+                """
+            )
+            columns_by_table: Dict[str, List[Tuple[str, str, int]]] = {}
+            for row in self.cursor.fetchall():
+                columns_by_table.setdefault(row["table_name"], []).append(
+                    (row["name"], row["type"], row["pk"])
+                )
 
             schema_info = "Database Schema:\n\n"
-            for table in tables:
+            for table, columns in columns_by_table.items():
                 schema_info += f"Table: {table}\n"
-                self.cursor.execute(f"PRAGMA table_info({table});")
-                columns = self.cursor.fetchall()
                 schema_info += "Columns:\n"
-                for col in columns:
-                    col_name = col["name"]
-                    col_type = col["type"]
-                    is_pk = "PRIMARY KEY" if col["pk"] == 1 else ""
+                for col_name, col_type, pk in columns:
+                    is_pk = "PRIMARY KEY" if pk == 1 else ""
                     schema_info += f"- {col_name} ({col_type}) {is_pk}\n"
 
                 try:
                     self.cursor.execute(f"SELECT * FROM {table} LIMIT 1;")
                     rows = self.cursor.fetchall()
                     if rows:
-                        schema_info += "Sample data:\n"
-                        for row in rows:
-                            row_dict = {}
-                            for key in row.keys():
-                                value = row[key]
-                                if isinstance(value, str) and len(value) > 80:
-                                    value = value[:77] + "..."
-                                row_dict[key] = value
-                            schema_info += f"- {json.dumps(row_dict, default=str)}\n"
+                        sample = [
+                            dict(zip(row.keys(), map(self._truncate_value, row)))
+                            for row in rows
+                        ]
+                        schema_info += "Sample data:\n" + "".join(
+                            f"- {json.dumps(row_dict, default=str)}\n" for row_dict in sample
+                        )
                 except sqlite3.Error:
                     schema_info += "Could not retrieve sample data.\n"
                 schema_info += "\n"
@@ -79,8 +136,13 @@ class SQLAgent:
         except sqlite3.Error as e:
             return f"Error retrieving schema: {str(e)}"
 
-    def generate_sql(self, request: SQLGenerationRequest, error_message: str = None) -> SQLGenerationResponse:
-        response = self.llm_client.generate_sql(request.query, self.schema_info, error_message)
+    def generate_sql(
+        self,
+        request: SQLGenerationRequest,
+        error_message: str = None,
+        on_token=None,
+    ) -> SQLGenerationResponse:
+        response = self.llm_client.generate_sql(request.query, self.schema_info, error_message, on_token=on_token)
         sql = self.sanitize_sql(response.get("sql_query", ""))
         return SQLGenerationResponse(
             sql_query=sql,
@@ -166,6 +228,25 @@ class SQLAgent:
     def is_read_only_sql(cls, sql_query: str) -> bool:
         return cls.read_only_rejection_reason(sql_query) is None
 
+    def _execute_select(self, sql: str) -> Tuple[Tuple[str, ...], Tuple[Tuple[Any, ...], ...]]:
+        """Run a sanitized read-only statement, returning hashable frozen results.
+
+        Exceptions propagate so the lru_cache wrapper never caches failures.
+        """
+        # Fresh cursor per call, execute+fetch under the lock: concurrent
+        # workers never share cursor state or interleave their result sets.
+        with self._db_lock:
+            cur = self.conn.cursor()
+            # Row factory off: rows come back as plain tuples from the C layer.
+            cur.row_factory = None
+            cur.execute(sql)
+            rows = cur.fetchall()
+            description = cur.description
+        if not rows:
+            return (), ()
+        columns = tuple(desc[0] for desc in description)
+        return columns, tuple(rows)
+
     def execute_sql(self, sql_query: str) -> Tuple[Optional[SQLQueryResult], Optional[str]]:
         # Reject on the raw payload first so trailing DROP/INSERT after a SELECT cannot pass.
         reason = self.read_only_rejection_reason(sql_query)
@@ -173,18 +254,48 @@ class SQLAgent:
             return None, f"Only one read-only SELECT, WITH ... SELECT, or EXPLAIN SELECT query is allowed. ({reason})"
         sql = self.sanitize_sql(sql_query)
         try:
-            self.cursor.execute(sql)
-            rows = self.cursor.fetchall()
+            columns, rows = self._cached_select(sql)
+        except sqlite3.Error as e:
+            return None, f"SQL execution error: {str(e)}"
 
-            if not rows:
-                return SQLQueryResult(columns=[], rows=[], row_count=0), None
+        if not rows:
+            return SQLQueryResult(columns=[], rows=[], row_count=0), None
+        row_data = [list(row) for row in rows]
+        return SQLQueryResult(columns=list(columns), rows=row_data, row_count=len(row_data)), None
 
-            columns = [desc[0] for desc in self.cursor.description]
-            row_data = [[row[col] for col in columns] for row in rows]
-            return SQLQueryResult(columns=columns, rows=row_data, row_count=len(row_data)), None
-        except sqlite3.Error as e:
+    def execute_sql_df(self, sql_query: str):
+        """Execute a read-only query straight into a DataFrame (C-level fetch path).
+
+        Returns (DataFrame, None) on success or (None, error message) like execute_sql.
+        """
+        import pandas as pd
+
+        reason = self.read_only_rejection_reason(sql_query)
+        if reason:
+            return None, f"Only one read-only SELECT, WITH ... SELECT, or EXPLAIN SELECT query is allowed. ({reason})"
+        try:
+            with self._db_lock:
+                return pd.read_sql_query(self.sanitize_sql(sql_query), self.conn), None
+        except (sqlite3.Error, pd.errors.DatabaseError) as e:
             return None, f"SQL execution error: {str(e)}"
 
+    def static_validation_error(self, sql_query: str) -> Optional[str]:
+        """Compile the statement without running it to catch broken SQL cheaply.
+
+        EXPLAIN runs only the parser/planner, so unknown tables or columns and
+        syntax errors surface here and feed the repair loop without ever
+        executing against the database.
+        """
+        sql = self.sanitize_sql(sql_query)
+        if not sql or sql.upper().startswith("EXPLAIN"):
+            return None
+        try:
+            with self._db_lock:
+                self.conn.execute(f"EXPLAIN {sql}").fetchall()
+        except sqlite3.Error as e:
+            return f"SQL validation error: {str(e)}"
+        return None
+
     def improve_sql(self, natural_query: str, failed_sql: str, error_message: str) -> SQLGenerationResponse:
         response = self.llm_client.improve_sql(natural_query, self.schema_info, failed_sql, error_message)
         return SQLGenerationResponse(
@@ -218,10 +329,14 @@ class SQLAgent:
                 checks.append("batch_balance_shape_ok")
         return {"checks": checks} if checks else None
 
-    def process_query(self, natural_query: str) -> SQLAgentResponse:
-        """Agentic loop: generate → sanitize → execute → repair on real failures."""
+    def process_query(self, natural_query: str, on_token=None) -> SQLAgentResponse:
+        """Agentic loop: generate → sanitize → execute → repair on real failures.
+
+        on_token, when given, receives raw completion deltas as the first
+        generation streams in (repair attempts stay non-streaming).
+        """
         request = SQLGenerationRequest(query=natural_query)
-        sql_response = self.generate_sql(request)
+        sql_response = self.generate_sql(request, on_token=on_token)
         current_sql = self.sanitize_sql(sql_response.sql_query)
         current_explanation = sql_response.explanation
 
@@ -248,7 +363,12 @@ class SQLAgent:
         error = None
 
         for attempt in range(self.max_retries + 1):
-            result, error = self.execute_sql(current_sql)
+            # Planner-level check first: broken SQL goes straight to repair
+            # without touching the database.
+            error = self.static_validation_error(current_sql)
+            result = None
+            if not error:
+                result, error = self.execute_sql(current_sql)
             if not error:
                 verification = self.verify_result(natural_query, result)
                 if verification and verification.get("checks"):
@@ -284,6 +404,33 @@ class SQLAgent:
             improvement_history=improvement_history if improvement_history else None,
         )
 
+    async def aprocess_query(self, natural_query: str) -> SQLAgentResponse:
+        """Async process_query: runs the generate → execute → repair pipeline in a
+        worker thread so independent queries can overlap their LLM wait time."""
+        return await asyncio.to_thread(self.process_query, natural_query)
+
+    async def aprocess_queries(
+        self,
+        natural_queries: List[str],
+        max_concurrency: int = 4,
+    ) -> List[Any]:
+        """Process a batch of queries with bounded concurrency.
+
+        While one query waits on the LLM (generate or repair), another runs its
+        SQLite execution on a different worker thread, so wall-clock approaches
+        the slowest pipeline rather than the sum. Failures come back as the
+        raised exception in that slot instead of cancelling the batch.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def run_one(query: str) -> SQLAgentResponse:
+            async with semaphore:
+                return await self.aprocess_query(query)
+
+        return await asyncio.gather(
+            *(run_one(query) for query in natural_queries), return_exceptions=True
+        )
+
     def close(self) -> None:
         if self.conn:
             self.conn.close()
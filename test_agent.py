@@ -2,6 +2,7 @@
 """
 Test script for SQL Agent
 """
+import asyncio
 import os
 import sys
 import json
@@ -12,7 +13,6 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from llm_client import LLMClient
 from sql_agent import SQLAgent
-from models import SQLGenerationRequest
 
 # Load environment variables
 load_dotenv()
@@ -38,34 +38,33 @@ def test_sql_generation():
         "Which customer spent the most money?"
     ]
     
-    for query in test_queries:
+    # Run the queries concurrently: wall-clock becomes the slowest single
+    # generation instead of the sum, with concurrency capped inside the agent
+    responses = asyncio.run(sql_agent.aprocess_queries(test_queries, max_concurrency=4))
+
+    for query, response in zip(test_queries, responses):
         print(f"\nTesting query: '{query}'")
-        
-        # Generate SQL
-        try:
-            request = SQLGenerationRequest(query=query)
-            sql_response = sql_agent.generate_sql(request)
-            
-            print("Generated SQL:")
-            print(sql_response.sql_query)
-            print("\nExplanation:")
-            print(sql_response.explanation)
-            
-            # Execute SQL
-            result, error = sql_agent.execute_sql(sql_response.sql_query)
-            
-            if error:
-                print(f"\nError executing SQL: {error}")
-            else:
-                print(f"\nExecution successful, returned {result.row_count} rows")
-                if result.row_count > 0:
-                    print("\nColumns:")
-                    print(result.columns)
-                    print("\nFirst row:")
-                    print(result.rows[0] if result.rows else "No rows")
-        except Exception as e:
-            print(f"Error processing query: {str(e)}")
-    
+
+        if isinstance(response, Exception):
+            print(f"Error processing query: {str(response)}")
+            continue
+
+        print("Generated SQL:")
+        print(response.generated_sql)
+        print("\nExplanation:")
+        print(response.explanation)
+
+        if response.error:
+            print(f"\nError executing SQL: {response.error}")
+        elif response.query_result:
+            result = response.query_result
+            print(f"\nExecution successful, returned {result.row_count} rows")
+            if result.row_count > 0:
+                print("\nColumns:")
+                print(result.columns)
+                print("\nFirst row:")
+                print(result.rows[0] if result.rows else "No rows")
+
     # Close the database connection
     sql_agent.close()
     print("\nTests completed")
@@ -43,6 +43,11 @@ class SQLSafetyTests(unittest.TestCase):
         self.assertIsNone(error)
         self.assertEqual(result.row_count, 1)
 
+    def test_static_validation_catches_unknown_table(self):
+        self.assertIsNone(self.agent.static_validation_error("SELECT order_id FROM orders"))
+        error = self.agent.static_validation_error("SELECT x FROM no_such_table")
+        self.assertIn("no such table", error)
+
     def test_quoted_json_fragment_is_recoverable(self):
         noisy = '"sql_query": "SELECT order_id FROM orders", "explanation": "x"'
         cleaned = SQLAgent.sanitize_sql(noisy)